@@ -0,0 +1,65 @@
+'''
+pure-functional twin of the point robot, everything below is jit-able and vmap-able
+kept out of the `rlkit.envs` auto-import so that jax only loads when it is used, see `point_env_jax`
+
+ - `reset()` / `step()` act on a single (2,) state
+ - `rollout()` scans `step()` over a fixed action sequence
+ - `run_rollout()` runs a whole episode on-device for every goal in a (n_tasks, 2) array
+'''
+from functools import partial
+
+import jax
+import jax.numpy as jnp
+from jax import lax
+
+
+def reset(key, goal):
+    ''' random start location on the unit square, the start does not depend on `goal` '''
+    return jax.random.uniform(key, (2,), minval=-1., maxval=1.)
+
+
+@partial(jax.jit, static_argnames=('radius',))
+def step(state, action, goal, radius):
+    ''' returns (state, obs, dense reward, done, sparse reward) '''
+    state = state + action
+    d = jnp.linalg.norm(state - goal)
+    inside = d <= radius
+    sparse = jnp.where(inside, 1.0 - d, 0.0)
+    return state, state, -d, jnp.array(False), sparse
+
+
+def rollout(state0, goal, actions, radius=0.2):
+    ''' step through `actions` of shape (T, 2), returns the final state and (obs, reward, sparse) of shape (T, ...) '''
+    def body(state, action):
+        state, obs, reward, done, sparse = step(state, action, goal, radius)
+        return state, (obs, reward, sparse)
+    return lax.scan(body, state0, actions)
+
+
+# same action sequences for every task
+batched_rollout = jax.vmap(rollout, in_axes=(0, 0, None))
+
+
+@partial(jax.jit, static_argnames=('actions_fn', 'T', 'radius'))
+def run_rollout(key, goals, actions_fn, T, radius=0.2):
+    '''
+    roll out `T` steps for every goal in `goals`
+    `actions_fn(key, obs) -> action` must be jax-traceable
+    returns (obs, actions, rewards, sparse_rewards), each with leading dims (n_tasks, T)
+    '''
+    def episode(key, goal):
+        key, reset_key = jax.random.split(key)
+
+        def body(carry, _):
+            state, key = carry
+            key, action_key = jax.random.split(key)
+            action = actions_fn(action_key, state)
+            state, obs, reward, done, sparse = step(state, action, goal, radius)
+            return (state, key), (obs, action, reward, sparse)
+
+        _, traj = lax.scan(body, (reset(reset_key, goal), key), None, length=T)
+        return traj
+
+    keys = jax.random.split(key, goals.shape[0])
+    return jax.vmap(episode)(keys, goals)
+
@@ -0,0 +1,40 @@
+'''
+legacy gym adapter for the jax point robot in `_point_env_jax`
+
+jax is imported lazily: this module is auto-imported with every `import rlkit.envs`,
+the functional API (`reset`, `step`, `rollout`, `batched_rollout`, `run_rollout`)
+is still reachable as attributes of this module and loads jax on first access
+'''
+import numpy as np
+
+from . import register_env
+from .point_robot import PointEnv
+
+_FUNCTIONAL = ('reset', 'step', 'rollout', 'batched_rollout', 'run_rollout')
+
+
+def __getattr__(name):
+    if name in _FUNCTIONAL:
+        from . import _point_env_jax
+        return getattr(_point_env_jax, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+@register_env('point-robot-jax')
+class JaxPointEnv(PointEnv):
+    '''
+    legacy gym interface on top of the jax `step()`
+
+     - reward is the dense L2 distance, the sparse reward is returned in the info
+     '''
+    def __init__(self, randomize_tasks=False, n_tasks=2, goal_radius=0.2):
+        self.goal_radius = goal_radius
+        super().__init__(randomize_tasks, n_tasks)
+
+    def step(self, action):
+        # imported here so jax only loads once the env is stepped
+        from ._point_env_jax import step
+        state, obs, reward, done, sparse = step(self._state, action, self._goal, self.goal_radius)
+        self._state = np.array(state)
+        ob = self._get_obs()
+        return ob, float(reward), bool(done), {'sparse_reward': float(sparse)}
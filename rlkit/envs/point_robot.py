@@ -1,9 +1,117 @@
+import math
+from functools import lru_cache
+
 import numpy as np
 from gym import spaces
 from gym import Env
 
 from . import register_env
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional, without it the kernels below run as plain python
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
+
+class _RNGPool(object):
+    """
+    uniform samples in [-1, 1) drawn from a `RandomState` a block at a time
+
+    the envs below only need one or two random floats per call, where the
+    dispatch cost of `np.random` dominates; each env owns a pool, seeded from
+    the global `np.random` on construction, use `seed()` to reseed it
+    """
+
+    def __init__(self, seed=None, size=1 << 12):
+        self._size = size
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        ''' reseed and drop the samples left in the block '''
+        if seed is None:
+            seed = np.random.randint(2 ** 31)
+        self.rng = np.random.RandomState(seed)
+        self._buf = None
+        self._i = self._size
+        return seed
+
+    def _refill(self):
+        self._buf = self.rng.uniform(-1., 1., size=self._size)
+        self._i = 0
+
+    def _next(self):
+        if self._i + 1 > self._size:
+            self._refill()
+        u = self._buf[self._i]
+        self._i += 1
+        return u
+
+    def uniform2(self):
+        if self._i + 2 > self._size:
+            self._refill()
+        u = self._buf[self._i:self._i + 2]
+        self._i += 2
+        return u
+
+    def uniform01(self):
+        return 0.5 * (self._next() + 1.)
+
+    def angle(self):
+        return np.pi * (self._next() + 1.)
+
+
+@njit(cache=True, fastmath=True)
+def _sparse_step(x, y, ax, ay, gx, gy, radius_sq, flags, teleport, angle, lava_bounds, lava_cost):
+    '''
+    one step of any of the sparse point robots on the float state (x, y), `flags` = (lava, sub_bonus) picks the extra terms
+    `teleport` moves the agent to distance 5 at `angle` instead of applying the action (ax, ay)
+    returns the new state, its distance to the goal (gx, gy), the sparse reward and the reward `step()` returns
+    '''
+    has_lava, has_sub_bonus = flags
+    if teleport:
+        x = 5. * math.cos(angle)
+        y = 5. * math.sin(angle)
+    else:
+        x += ax
+        y += ay
+    dx = x - gx
+    dy = y - gy
+    d2 = dx * dx + dy * dy
+    inside = d2 <= radius_sq
+    dist = math.sqrt(d2)
+    # make sparse rewards positive
+    sparse_reward = (1. - dist) * inside
+    reward = sparse_reward
+    if has_lava:
+        lx, hx, ly = lava_bounds
+        if lx <= x <= hx and y >= ly:
+            sparse_reward -= lava_cost
+            reward = sparse_reward
+    if has_sub_bonus:
+        reward = -dist + inside
+        sy = y + 1.
+        sub_dist = math.sqrt(x * x + sy * sy)
+        if sub_dist < 0.5:
+            sparse_reward += 0.8 - sub_dist
+            reward = 0.8 - sub_dist
+    return x, y, dist, sparse_reward, reward
+
+
+@lru_cache(maxsize=None)
+def _make_semicircle_goals(n_tasks):
+    ''' `n_tasks` float32 goals on the upper unit half-circle, shuffled; read-only as it is shared between envs '''
+    radius = 1.0
+    angles = np.linspace(0, np.pi, num=n_tasks)
+    xs = radius * np.cos(angles)
+    ys = radius * np.sin(angles)
+    goals = np.stack([xs, ys], axis=1).astype(np.float32)
+    # same order as shuffling after np.random.seed(1337), without touching the global stream
+    goals = goals[np.random.RandomState(1337).permutation(n_tasks)]
+    goals.setflags(write=False)
+    return goals
+
 
 @register_env('point-robot')
 class PointEnv(Env):
@@ -15,59 +123,112 @@ class PointEnv(Env):
      - reward is L2 distance
     """
 
-    def __init__(self, randomize_tasks=False, n_tasks=2):
+    # identical for every instance, so shared rather than rebuilt in `__init__()`
+    observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(2,), dtype=np.float32)
+    action_space = spaces.Box(low=-0.1, high=0.1, shape=(2,), dtype=np.float32)
 
-        if randomize_tasks:
-            np.random.seed(1337)
-            goals = [[np.random.uniform(-1., 1.), np.random.uniform(-1., 1.)] for _ in range(n_tasks)]
-        else:
-            # some hand-coded goals for debugging
-            goals = [np.array([10, -10]),
-                     np.array([10, 10]),
-                     np.array([-10, 10]),
-                     np.array([-10, -10]),
-                     np.array([0, 0]),
-
-                     np.array([7, 2]),
-                     np.array([0, 4]),
-                     np.array([-6, 9])
-                     ]
-            goals = [g / 10. for g in goals]
-        self.goals = goals
+    def __init__(self, randomize_tasks=False, n_tasks=2):
+        self._pool = _RNGPool()
+        self._set_goals(self._build_goals(randomize_tasks, n_tasks))
 
         self.reset_task(0)
-        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(2,))
-        self.action_space = spaces.Box(low=-0.1, high=0.1, shape=(2,))
+
+    def _build_goals(self, randomize_tasks, n_tasks):
+        ''' goals of all tasks, subclasses override this to sample their own '''
+        if randomize_tasks:
+            # local stream so the global np.random state is left alone
+            return np.random.RandomState(1337).uniform(-1., 1., size=(n_tasks, 2))
+        # some hand-coded goals for debugging
+        goals = [np.array([10, -10]),
+                 np.array([10, 10]),
+                 np.array([-10, 10]),
+                 np.array([-10, -10]),
+                 np.array([0, 0]),
+
+                 np.array([7, 2]),
+                 np.array([0, 4]),
+                 np.array([-6, 9])
+                 ]
+        return [g / 10. for g in goals]
+
+    def _set_goals(self, goals):
+        ''' keep all goals in one float32 (n_tasks, 2) array, `self.goals` aliases it; no copy if already one '''
+        self._goals_arr = np.ascontiguousarray(goals, dtype=np.float32)
+        self.goals = self._goals_arr
 
     def reset_task(self, idx):
         ''' reset goal AND reset the agent '''
-        self._goal = self.goals[idx]
+        self._goal = self._goals_arr[idx]
+        self._step_fn = self._make_step_fn()
         self.reset()
 
+    def __getstate__(self):
+        # the step closure can't be pickled, `__setstate__()` rebuilds it from the goal
+        state = self.__dict__.copy()
+        del state['_step_fn']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._step_fn = self._make_step_fn()
+
+    def _make_step_fn(self):
+        ''' distance to the current goal with the goal baked in, `(x, y) -> dist` '''
+        gx, gy = self._goal.tolist()
+        hypot = math.hypot
+
+        def _step(x, y):
+            return hypot(x - gx, y - gy)
+        return _step
+
+    # the state is kept as two python floats `_sx`, `_sy`, this exposes it as a read-only array
+    # so that item writes fail loudly, assign the whole `_state` to move the agent
+    @property
+    def _state(self):
+        state = np.array((self._sx, self._sy), dtype=np.float32)
+        state.setflags(write=False)
+        return state
+
+    @_state.setter
+    def _state(self, state):
+        self._sx = float(state[0])
+        self._sy = float(state[1])
+
+    def seed(self, seed=None):
+        ''' reseed the randomness of resets, obs noise and teleports '''
+        return [self._pool.seed(seed)]
+
     def get_all_task_idx(self):
         return range(len(self.goals))
 
     def reset_model(self):
         # reset to a random location on the unit square
-        self._state = np.random.uniform(-1., 1., size=(2,))
+        self._sx, self._sy = self._pool.uniform2().tolist()
         return self._get_obs()
 
     def reset(self):
         return self.reset_model()
 
     def _get_obs(self):
-        return np.copy(self._state)
+        return np.array((self._sx, self._sy), dtype=np.float32)
 
     def step(self, action):
-        self._state = self._state + action
-        x, y = self._state
-        x -= self._goal[0]
-        y -= self._goal[1]
-        reward = - (x ** 2 + y ** 2) ** 0.5
+        self._sx += float(action[0])
+        self._sy += float(action[1])
+        reward = -self._step_fn(self._sx, self._sy)
         done = False
         ob = self._get_obs()
         return ob, reward, done, dict()
 
+    def step_into(self, action, obs_buf, rew_buf, t):
+        ''' `step()` writing obs and reward into row `t` of caller-owned buffers, returns done only '''
+        self._sx += float(action[0])
+        self._sy += float(action[1])
+        obs_buf[t, 0] = self._sx
+        obs_buf[t, 1] = self._sy
+        rew_buf[t] = -self._step_fn(self._sx, self._sy)
+        return False
+
     def viewer_setup(self):
         print('no viewer')
         pass
@@ -76,258 +237,194 @@ class PointEnv(Env):
         print('current state:', self._state)
 
 
-@register_env('sparse-point-robot')
-class SparsePointEnv(PointEnv):
-    '''
-     - tasks sampled from unit half-circle
-     - reward is L2 distance given only within goal radius
-
-     NOTE that `step()` returns the dense reward because this is used during meta-training
-     the algorithm should call `sparsify_rewards()` to get the sparse rewards
-     '''
-    def __init__(self, randomize_tasks=False, n_tasks=20000, goal_radius=0.2):
-        super().__init__(randomize_tasks, n_tasks)
-        self.goal_radius = goal_radius
-
-        if randomize_tasks:
-            np.random.seed(1337)
-            radius = 1.0
-            angles = np.linspace(0, np.pi, num=n_tasks)
-            xs = radius * np.cos(angles)
-            ys = radius * np.sin(angles)
-            goals = np.stack([xs, ys], axis=1)
-            np.random.shuffle(goals)
-            goals = goals.tolist()
-
-        self.goals = goals
-        self.reset_task(0)
-
-    def sparsify_rewards(self, r):
-        ''' zero out rewards when outside the goal radius '''
-        mask = (r >= -self.goal_radius).astype(np.float32)
-        r = r * mask
-        return r
+@register_env('point-robot-batched')
+class BatchedPointEnv(PointEnv):
+    """
+    point robot with every task stepped at once
 
-    def reset_model(self):
-        self._state = np.array([0, 0])
-        return self._get_obs()
+     - `batched_step()` advances one agent per task with a single NumPy update
+     - `step()` still steps the current task only
+     - `reset_batch()` restarts the agents of all tasks
+    """
 
-    def step(self, action):
-        ob, reward, done, d = super().step(action)
-        sparse_reward = self.sparsify_rewards(reward)
-        # make sparse rewards positive
-        if reward >= -self.goal_radius:
-            sparse_reward += 1
-        d.update({'sparse_reward': sparse_reward})
-        reward = sparse_reward
-        return ob, reward, done, d
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reset_batch()
+
+    def _init_states(self, n):
+        # one block for all tasks, straight from the env's seeded stream
+        return self._pool.rng.uniform(-1., 1., size=(n, 2)).astype(np.float32)
+
+    def reset_batch(self):
+        ''' reset the agents of all tasks, returns obs of shape (n_tasks, 2) '''
+        self._states = self._init_states(len(self._goals_arr))
+        return self._states.copy()
+
+    def batched_step(self, actions):
+        self._states += actions
+        diff = self._states - self._goals_arr
+        reward = -np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        done = np.zeros(len(reward), dtype=bool)
+        ob = self._states.copy()
+        return ob, reward, done, dict()
 
 
-@register_env('sparse-point-robot-noise')
-class SparsePointEnvNoise(PointEnv):
+class _SparsePointBase(PointEnv):
     '''
      - tasks sampled from unit half-circle
      - reward is L2 distance given only within goal radius
 
      NOTE that `step()` returns the dense reward because this is used during meta-training
      the algorithm should call `sparsify_rewards()` to get the sparse rewards
+
+     the registered sparse envs below only set the flags picking the extra terms of `_sparse_step()`
      '''
+    _has_noise = False
+    _has_teleport = False
+    _has_lava = False
+    _has_sub_bonus = False
+
+    lava_cost = 0
+    _lava_bounds = (0., 0., 0.)
+
     def __init__(self, randomize_tasks=False, n_tasks=2, goal_radius=0.3):
-        super().__init__(randomize_tasks, n_tasks)
+        # set before `PointEnv.__init__()` as `reset_task()` bakes them into the step
         self.goal_radius = goal_radius
+        self._neg_radius = -goal_radius
+        self._r2 = goal_radius * goal_radius
+        self._flags = (self._has_lava, self._has_sub_bonus)
+        super().__init__(randomize_tasks, n_tasks)
 
+    def _build_goals(self, randomize_tasks, n_tasks):
         if randomize_tasks:
-            np.random.seed(1337)
-            radius = 1.0
-            angles = np.linspace(0, np.pi, num=n_tasks)
-            xs = radius * np.cos(angles)
-            ys = radius * np.sin(angles)
-            goals = np.stack([xs, ys], axis=1)
-            np.random.shuffle(goals)
-            goals = goals.tolist()
-
-        self.goals = goals
-        self.reset_task(0)
-        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(3,))
+            return _make_semicircle_goals(n_tasks)
+        return super()._build_goals(randomize_tasks, n_tasks)
 
     def sparsify_rewards(self, r):
         ''' zero out rewards when outside the goal radius '''
-        mask = (r >= -self.goal_radius).astype(np.float32)
-        r = r * mask
-        return r
+        return np.where(r >= self._neg_radius, r, 0.)
 
     def reset_model(self):
-        self._state = np.array([0, 0])
+        self._sx = self._sy = 0.
         return self._get_obs()
 
-    def _get_obs(self):
-        x, y = self._state
+    def _noisy_obs(self):
+        x, y = self._sx, self._sy
         noise_variance = 2
-        noise = np.random.rand()*noise_variance*2
-        if (x**2+(y+1)**2)**0.5>0.3:
+        noise = self._pool.uniform01()*noise_variance*2
+        if math.hypot(x, y+1)>0.3:
             noise = 0
-        return np.concatenate([np.copy(self._state),[noise]])
+        return np.array((x, y, noise), dtype=np.float32)
+
+    def _get_obs(self):
+        if self._has_noise:
+            return self._noisy_obs()
+        return np.array((self._sx, self._sy), dtype=np.float32)
+
+    def _make_step_fn(self):
+        ''' `_sparse_step()` with the goal and env constants baked in, `(x, y, ax, ay) -> (x, y, sparse reward, reward)` '''
+        gx, gy = self._goal.tolist()
+        r2, flags, pool = self._r2, self._flags, self._pool
+        lava_bounds, lava_cost = self._lava_bounds, self.lava_cost
+        has_teleport = self._has_teleport
+
+        def _step(x, y, ax, ay):
+            # within 0.3 of (0, -1) the agent is teleported instead of moved, only then is an angle drawn
+            teleport = False
+            angle = 0.
+            if has_teleport and x * x + (y + 1.) * (y + 1.) < 0.09:
+                teleport = True
+                angle = pool.angle()
+            x, y, dist, sparse_reward, reward = _sparse_step(
+                x, y, ax, ay, gx, gy, r2, flags, teleport, angle, lava_bounds, lava_cost)
+            return x, y, sparse_reward, reward
+        return _step
 
     def step(self, action):
-        ob, reward, done, d = super().step(action)
-        sparse_reward = self.sparsify_rewards(reward)
-        # make sparse rewards positive
-        if reward >= -self.goal_radius:
-            sparse_reward += 1
-        d.update({'sparse_reward': sparse_reward})
-        reward = sparse_reward
+        self._sx, self._sy, sparse_reward, reward = self._step_fn(self._sx, self._sy, float(action[0]), float(action[1]))
+        done = False
+        ob = self._get_obs()
+        d = {'sparse_reward': sparse_reward}
         return ob, reward, done, d
 
+    def step_into(self, action, obs_buf, rew_buf, t):
+        ''' `step()` writing obs and reward into row `t` of caller-owned buffers, returns done only '''
+        self._sx, self._sy, sparse_reward, reward = self._step_fn(self._sx, self._sy, float(action[0]), float(action[1]))
+        if self._has_noise:
+            obs_buf[t] = self._noisy_obs()
+        else:
+            obs_buf[t, 0] = self._sx
+            obs_buf[t, 1] = self._sy
+        rew_buf[t] = reward
+        return False
 
-@register_env('sparse-point-robot-random')
-class SparsePointEnv(PointEnv):
-    '''
-     - tasks sampled from unit half-circle
-     - reward is L2 distance given only within goal radius
 
-     NOTE that `step()` returns the dense reward because this is used during meta-training
-     the algorithm should call `sparsify_rewards()` to get the sparse rewards
+@register_env('sparse-point-robot')
+class SparsePointEnv(_SparsePointBase):
+    '''
+     - returns the sparse reward
      '''
-    def __init__(self, randomize_tasks=True, n_tasks=2, goal_radius=0.3):
-        super().__init__(randomize_tasks, n_tasks)
-        self.goal_radius = goal_radius
-
-        if randomize_tasks:
-            np.random.seed(1337)
-            radius = 1.0
-            angles = np.linspace(0, np.pi, num=n_tasks)
-            xs = radius * np.cos(angles)
-            ys = radius * np.sin(angles)
-            goals = np.stack([xs, ys], axis=1)
-            np.random.shuffle(goals)
-            goals = goals.tolist()
-
-        self.goals = goals
-        self.reset_task(0)
-        #self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(3,))
+    def __init__(self, randomize_tasks=False, n_tasks=20000, goal_radius=0.2):
+        super().__init__(randomize_tasks, n_tasks, goal_radius)
 
-    def sparsify_rewards(self, r):
-        ''' zero out rewards when outside the goal radius '''
-        mask = (r >= -self.goal_radius).astype(np.float32)
-        r = r * mask
-        return r
 
-    def reset_model(self):
-        self._state = np.array([0, 0])
-        return self._get_obs()
+@register_env('sparse-point-robot-batched')
+class BatchedSparsePointEnv(SparsePointEnv, BatchedPointEnv):
+    '''
+     - sparse point robot with every task stepped at once, see `BatchedPointEnv`
+     '''
 
-    def _get_obs(self):
-        #x, y = self._state
-        #noise_variance = (x ** 2 + y ** 2) ** 0.5
-        #noise = np.random.rand()*noise_variance*5
-        return np.copy(self._state)
-        return np.concatenate([np.copy(self._state),[noise]])
-
-    def inner_step(self, action):
-        x, y = self._state
-        x -= 0
-        y -= -1
-        dist = (x ** 2 + y ** 2) ** 0.5
-        if dist<0.3:
-            angle = np.random.rand()*np.pi*2
-            self._state[0] = 5 * np.cos(angle)
-            self._state[1] = 5 * np.sin(angle)
-        else:
-            self._state = self._state + action
-        x, y = self._state
-        x -= self._goal[0]
-        y -= self._goal[1]
-        reward = - (x ** 2 + y ** 2) ** 0.5
-        done = False
-        ob = self._get_obs()
-        return ob, reward, done, dict()
+    def _init_states(self, n):
+        return np.zeros((n, 2), dtype=np.float32)
 
-    def step(self, action):
-        ob, reward, done, d = self.inner_step(action)
-        sparse_reward = self.sparsify_rewards(reward)
+    def batched_step(self, actions):
+        ob, reward, done, d = super().batched_step(actions)
         # make sparse rewards positive
-        if reward >= -self.goal_radius:
-            sparse_reward += 1
-        d.update({'sparse_reward': sparse_reward})
+        mask = reward >= self._neg_radius
+        sparse_reward = np.where(mask, reward + 1.0, 0.0)
+        d['sparse_reward'] = sparse_reward
         reward = sparse_reward
         return ob, reward, done, d
 
-@register_env("sparse-lava-point")
-class SparseLavaPointEnv(PointEnv):
-    '''
-    - reward is L2 distance given only within goal radius
 
-    NOTE that `step()` returns the dense reward because this is used during meta-training
-    the algorithm should call `sparsify_rewards()` to get the sparse rewards
+@register_env('sparse-point-robot-noise')
+class SparsePointEnvNoise(_SparsePointBase):
     '''
+     - returns the sparse reward
+     - the third obs dim is noise in [0, 4) within 0.3 of (0, -1), zero elsewhere
+     '''
+    _has_noise = True
+    observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(3,), dtype=np.float32)
 
-    def __init__(self, goal_radius=0.2, goal_sampler='semi-circle', lava_cost=5, n_tasks=1, randomize_tasks=True):
-        super().__init__(randomize_tasks, n_tasks)
-        self.goal_radius = goal_radius
-        self.lava_cost = lava_cost
-        self.lava_space = spaces.Box(low=np.array([-0.1, 0.1]), high=np.array([0.1, np.inf]), dtype=np.float64)
 
-        if randomize_tasks:
-            np.random.seed(1337)
-            radius = 1.0
-            angles = np.linspace(0, np.pi, num=n_tasks)
-            xs = radius * np.cos(angles)
-            ys = radius * np.sin(angles)
-            goals = np.stack([xs, ys], axis=1)
-            np.random.shuffle(goals)
-            goals = goals.tolist()
-
-        self.goals = goals
-        self.reset_task(0)
-        #self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(3,))
+@register_env('sparse-point-robot-random')
+class SparsePointEnvRandom(_SparsePointBase):
+    '''
+     - returns the sparse reward
+     - within 0.3 of (0, -1) the agent is teleported to a random point at distance 5
+     '''
+    _has_teleport = True
 
-    def sparsify_rewards(self, r):
-        ''' zero out rewards when outside the goal radius '''
-        mask = (r >= -self.goal_radius).astype(np.float32)
-        r = r * mask
-        return r
+    def __init__(self, randomize_tasks=True, n_tasks=2, goal_radius=0.3):
+        super().__init__(randomize_tasks, n_tasks, goal_radius)
 
-    def reset_model(self):
-        self._state = np.array([0, 0])
-        return self._get_obs()
 
-    def _get_obs(self):
-        #x, y = self._state
-        #noise_variance = (x ** 2 + y ** 2) ** 0.5
-        #noise = np.random.rand()*noise_variance*5
-        return np.copy(self._state)
-        return np.concatenate([np.copy(self._state),[noise]])
-
-    def inner_step(self, action):
-        x, y = self._state
-        x -= 0
-        y -= -1
-        dist = (x ** 2 + y ** 2) ** 0.5
-        if dist<0.3:
-            angle = np.random.rand()*np.pi*2
-            self._state[0] = 5 * np.cos(angle)
-            self._state[1] = 5 * np.sin(angle)
-        else:
-            self._state = self._state + action
-        x, y = self._state
-        x -= self._goal[0]
-        y -= self._goal[1]
-        reward = - (x ** 2 + y ** 2) ** 0.5
-        done = False
-        ob = self._get_obs()
-        return ob, reward, done, dict()
+@register_env("sparse-lava-point")
+class SparseLavaPointEnv(_SparsePointBase):
+    '''
+    - returns the sparse reward, minus `lava_cost` inside `lava_space`
+    - teleports like `SparsePointEnvRandom`
+    '''
+    _has_teleport = True
+    _has_lava = True
 
-    def step(self, action):
-        ob, reward, done, d = self.inner_step(action)
-        sparse_reward = self.sparsify_rewards(reward)
-        # make sparse rewards positive
-        if reward >= -self.goal_radius:
-            sparse_reward += 1
-        if self.lava_space.contains(ob):
-            sparse_reward -= self.lava_cost
-        d.update({'sparse_reward': sparse_reward})
-        reward = sparse_reward
-        return ob, reward, done, d
+    def __init__(self, goal_radius=0.2, goal_sampler='semi-circle', lava_cost=5, n_tasks=1, randomize_tasks=True):
+        self.lava_cost = lava_cost
+        self.lava_space = spaces.Box(low=np.array([-0.1, 0.1]), high=np.array([0.1, np.inf]), dtype=np.float64)
+        # bounds of `lava_space` as plain floats for `_sparse_step()`, its high y is inf
+        lava_lx, lava_ly = self.lava_space.low.tolist()
+        self._lava_bounds = (lava_lx, float(self.lava_space.high[0]), lava_ly)
+        super().__init__(randomize_tasks, n_tasks, goal_radius)
 
 
     # def __init__(self, goal_radius=0.2, max_episode_steps=100, goal_sampler='semi-circle', lava_cost=5, n_tasks=1, randomize_tasks=True):
@@ -361,58 +458,9 @@ class SparseLavaPointEnv(PointEnv):
 
 
 @register_env('sparse-point-robot-sub')
-class SparsePointEnvSub(PointEnv):
+class SparsePointEnvSub(_SparsePointBase):
     '''
-     - tasks sampled from unit half-circle
-     - reward is L2 distance given only within goal radius
-
-     NOTE that `step()` returns the dense reward because this is used during meta-training
-     the algorithm should call `sparsify_rewards()` to get the sparse rewards
+     - returns the dense reward, +1 inside the goal radius
+     - within 0.5 of (0, -1) the reward is 0.8 - d, and the sparse reward gets 0.8 - d on top
      '''
-    def __init__(self, randomize_tasks=False, n_tasks=2, goal_radius=0.3):
-        super().__init__(randomize_tasks, n_tasks)
-        self.goal_radius = goal_radius
-
-        if randomize_tasks:
-            np.random.seed(1337)
-            radius = 1.0
-            angles = np.linspace(0, np.pi, num=n_tasks)
-            xs = radius * np.cos(angles)
-            ys = radius * np.sin(angles)
-            goals = np.stack([xs, ys], axis=1)
-            np.random.shuffle(goals)
-            goals = goals.tolist()
-
-        self.goals = goals
-        self.reset_task(0)
-
-    def sparsify_rewards(self, r):
-        ''' zero out rewards when outside the goal radius '''
-        mask = (r >= -self.goal_radius).astype(np.float32)
-        r = r * mask
-        return r
-
-    def reset_model(self):
-        self._state = np.array([0, 0])
-        return self._get_obs()
-
-    def step(self, action):
-        ob, reward, done, d = super().step(action)
-        sparse_reward = self.sparsify_rewards(reward)
-        # make sparse rewards positive
-        if reward >= -self.goal_radius:
-            sparse_reward += 1
-            reward +=1
-
-        x = self._state[0]
-        y = self._state[1] + 1
-        dist = (x**2+y**2)**0.5
-        #reward = reward - dist * 0.7
-        if dist<0.5:
-            sparse_reward = sparse_reward + (0.8-dist)
-        if dist<0.5:
-            reward =  (0.8-dist)
-        #reward = sparse_reward + reward * 0.4
-        d.update({'sparse_reward': sparse_reward})
-        #reward = sparse_reward
-        return ob, reward, done, d
+    _has_sub_bonus = True